@@ -5,6 +5,7 @@ import cv2
 import os
 from ultralytics import YOLO
 from config import *
+from utils import INT8_IMAGE_SIZE
 
 
 class WeaponDetector:
@@ -18,6 +19,9 @@ class WeaponDetector:
         """
         self.model_path = model_path
         self.model = None
+        
+        # The exported TFLite model has a fixed input size; .pt models use the default
+        self.predict_args = {'imgsz': INT8_IMAGE_SIZE} if model_path.endswith('.tflite') else {}
         self.load_model()
     
     def load_model(self):
@@ -30,7 +34,8 @@ class WeaponDetector:
             if not os.path.exists(self.model_path):
                 raise FileNotFoundError(f"Model file not found: {self.model_path}")
             
-            self.model = YOLO(self.model_path)
+            # task is given explicitly since exported (.tflite/.onnx) models don't record it
+            self.model = YOLO(self.model_path, task='detect')
             print("✅ Model loaded successfully!")
             
         except Exception as e:
@@ -79,7 +84,7 @@ class WeaponDetector:
         Run detection on a frame and return results.
         """
         try:
-            results = self.model(frame, verbose=False)
+            results = self.model(frame, verbose=False, **self.predict_args)
             return results
         except Exception as e:
             print(f"❌ Detection error: {e}")
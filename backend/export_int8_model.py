@@ -0,0 +1,65 @@
+# export_int8_model.py
+# One-time export of the detection model to INT8 TFLite for Raspberry Pi
+
+import os
+import sys
+import shutil
+from ultralytics import YOLO
+from config import *
+from utils import INT8_MODEL_PATH, INT8_IMAGE_SIZE
+
+# Dataset whose validation images are used to calibrate the INT8 ranges
+CALIBRATION_DATASET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                       '..', 'guns-knives-yolo_dataset', 'guns-knives-yolo')
+
+# Generated dataset yaml pointing at the local copy of the dataset
+CALIBRATION_YAML = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'calibration_dataset.yaml')
+
+
+def write_calibration_yaml(dataset_dir):
+    """
+    Write a dataset yaml with this machine's absolute dataset path
+    (the yaml shipped with the dataset points at the original author's machine).
+    """
+    dataset_dir = os.path.abspath(dataset_dir)
+    if not os.path.isdir(dataset_dir):
+        raise FileNotFoundError(f"Dataset not found: {dataset_dir}")
+    
+    yaml_content = f"""
+path: {dataset_dir}
+train: train/images
+val: valid/images
+
+nc: 2
+names: ["knife", "pistol"]
+"""
+    with open(CALIBRATION_YAML, 'w') as f:
+        f.write(yaml_content.strip())
+    return CALIBRATION_YAML
+
+
+def export_int8_model(dataset_dir=CALIBRATION_DATASET_DIR):
+    """
+    Export MODEL_PATH to a full-integer TFLite model calibrated on the dataset,
+    and copy it to INT8_MODEL_PATH where get_optimal_camera_settings picks it up.
+    """
+    data = write_calibration_yaml(dataset_dir)
+    
+    print(f"🔄 Loading model from {MODEL_PATH}...")
+    model = YOLO(MODEL_PATH)
+    
+    print(f"📦 Exporting INT8 TFLite model (calibration data: {data})...")
+    exported_path = model.export(format='tflite', int8=True, data=data, imgsz=INT8_IMAGE_SIZE)
+    
+    # ultralytics writes into a <model>_saved_model folder; keep a copy next to the .pt
+    shutil.copyfile(exported_path, INT8_MODEL_PATH)
+    print(f"✅ INT8 model saved: {INT8_MODEL_PATH}")
+    return INT8_MODEL_PATH
+
+
+if __name__ == "__main__":
+    try:
+        export_int8_model(sys.argv[1] if len(sys.argv) > 1 else CALIBRATION_DATASET_DIR)
+    except Exception as e:
+        print(f"❌ INT8 export failed: {e}")
+        sys.exit(1)
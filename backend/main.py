@@ -6,7 +6,7 @@ import sys
 import time
 from threading import Thread
 from config import *
-from utils import setup_folders, get_camera, cleanup_camera
+from utils import setup_folders, get_camera, cleanup_camera, get_optimal_camera_settings
 from detection import WeaponDetector
 from screenshot_manager import ScreenshotManager
 from streaming_server import set_detector, update_streaming_frame, start_server
@@ -27,7 +27,7 @@ def main():
     
     # Initialize weapon detector
     try:
-        detector = WeaponDetector(MODEL_PATH)
+        detector = WeaponDetector(get_optimal_camera_settings()['model_path'])
     except Exception as e:
         print(f"❌ Failed to initialize weapon detector: {e}")
         sys.exit(1)
@@ -132,6 +132,9 @@ def main():
         print("\n📸 Processing final screenshots...")
         screenshot_manager.process_pending_screenshots()
         
+        # Place any security call still held by the call coalescing window
+        screenshot_manager.twilio_api.flush_pending_calls()
+        
         # Cleanup
         print("🧹 Cleaning up...")
         cleanup_camera(cap)
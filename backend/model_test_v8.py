@@ -8,8 +8,13 @@
 
 from ultralytics import YOLO
 import cv2
+import torch
 import sys
 import os
+import queue
+import signal
+import threading
+import platform
 from datetime import datetime, timedelta
 import json
 import time
@@ -27,24 +32,55 @@ SCREENSHOT_FOLDER= "weapon_detections"
 # Model Settings
 MODEL_PATH="best_fine-tuned_model.pt"
 
+# No display to show the video window on (e.g. a headless Raspberry Pi) - skip drawing,
+# cv2.imshow and cv2.waitKey entirely; stop with Ctrl+C instead
+HEADLESS = platform.system() == 'Linux' and not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
 
+# Inference Settings
+INFERENCE_IMAGE_SIZE=416  # Smaller than the default 640 for fewer FLOPs per frame
+
+
+
+def get_camera_backend():
+    """
+    Pick the OpenCV capture backend for this platform explicitly to skip backend autodetection.
+    """
+    system = platform.system()
+    if system == 'Linux':
+        return cv2.CAP_V4L2
+    if system == 'Windows':
+        return cv2.CAP_DSHOW
+    if system == 'Darwin':
+        return cv2.CAP_AVFOUNDATION
+    return cv2.CAP_ANY
+
+def list_camera_indices(max_index=5):
+    """
+    List camera indices to probe - on Linux only the /dev/videoN nodes that actually exist.
+    """
+    sysfs_dir = '/sys/class/video4linux'
+    if platform.system() == 'Linux' and os.path.isdir(sysfs_dir):
+        indices = sorted(int(name[5:]) for name in os.listdir(sysfs_dir)
+                         if name.startswith('video') and name[5:].isdigit())
+        return [index for index in indices if index < max_index]
+    return list(range(max_index))
 
 def test_camera_access():
     """
     Test if webcam is accessible by trying to open it with OpenCV.
+    Returns (camera_index, cap) with the working capture left open, or (None, None).
     """
     print("Testing webcam access...")
     
     # Try different camera indices
-    for camera_index in range(5):  # Try cameras 0-4
+    for camera_index in list_camera_indices(5):  # Try cameras 0-4
         try:
-            cap = cv2.VideoCapture(camera_index)
+            cap = cv2.VideoCapture(camera_index, get_camera_backend())
             if cap.isOpened():
                 ret, frame = cap.read()
                 if ret and frame is not None:
                     print(f"✓ Camera {camera_index} is working!")
-                    cap.release()
-                    return camera_index
+                    return camera_index, cap
                 cap.release()
         except Exception as e:
             continue
@@ -55,7 +91,7 @@ def test_camera_access():
     print("2. Try closing other applications that might be using the camera (Skype, Zoom, etc.)")
     print("3. Check Windows camera permissions in Settings > Privacy > Camera")
     print("4. Restart your computer if the camera was recently connected")
-    return None
+    return None, None
 
 def setup_folders():
     """
@@ -216,6 +252,64 @@ def check_weapon_detection(results):
     
     return None
 
+def capture_loop(cap, frame_queue, stop_event, frame_wanted):
+    """
+    Grab frames on a background thread so the camera buffer never goes stale,
+    decoding (retrieve) only the frame handed to inference - skipped frames
+    never pay the decode cost.
+    """
+    while not stop_event.is_set():
+        if not cap.grab():
+            print("✗ Failed to read frame from camera")
+            stop_event.set()
+            break
+        
+        # Inference is still busy with the previous frame - skip this one
+        if not frame_wanted.is_set():
+            continue
+        
+        ret, frame = cap.retrieve()
+        if not ret:
+            print("✗ Failed to read frame from camera")
+            stop_event.set()
+            break
+        frame_wanted.clear()
+        frame_queue.put(frame)
+
+def next_frame(frame_queue, stop_event, frame_wanted):
+    """
+    Ask the capture thread for the next frame and wait for it.
+    Returns None once capture has stopped.
+    """
+    frame_wanted.set()
+    while True:
+        try:
+            return frame_queue.get(timeout=1.0)
+        except queue.Empty:
+            if stop_event.is_set():
+                return None
+
+def load_detection_model(model_path):
+    """
+    Export the .pt model to ONNX once and load the exported copy, which ultralytics
+    runs on ONNX Runtime (CUDA provider when available, CPU otherwise).
+    Falls back to the PyTorch model if the export fails.
+    """
+    # Precision is part of the name so an FP16 export is never reused as FP32 (or vice versa)
+    half = torch.cuda.is_available()
+    onnx_path = os.path.splitext(model_path)[0] + ('_fp16.onnx' if half else '_fp32.onnx')
+    try:
+        if not os.path.exists(onnx_path) or os.path.getmtime(onnx_path) < os.path.getmtime(model_path):
+            print(f"📦 Exporting {model_path} to ONNX (one-time)...")
+            # FP16 export has to run on the GPU - ultralytics drops half=True on CPU
+            exported_path = YOLO(model_path).export(format='onnx', imgsz=INFERENCE_IMAGE_SIZE, half=half,
+                                                    dynamic=False, device=0 if half else 'cpu')
+            os.replace(exported_path, onnx_path)
+        return YOLO(onnx_path, task='detect')
+    except Exception as e:
+        print(f"⚠️  ONNX export failed, using PyTorch model: {e}")
+        return YOLO(model_path)
+
 def main():
     """
     Main function to run the model test.
@@ -223,16 +317,24 @@ def main():
     print(f"Loading model from: {MODEL_PATH}")
     
     try:
-        # Load the YOLOv8 model from the .pt file
-        model = YOLO(MODEL_PATH)
+        # Load the YOLOv8 model (ONNX export of the .pt file)
+        model = load_detection_model(MODEL_PATH)
         print("✓ Model loaded successfully!")
+        
+        # Run in half precision on CUDA GPUs
+        if torch.cuda.is_available():
+            predict_args = {'half': True, 'device': 0}
+            print("✓ Using CUDA with FP16 inference")
+        else:
+            predict_args = {'device': 'cpu'}
     except Exception as e:
         print(f"✗ Error loading model: {e}")
         print("Please ensure the model file is in the same directory as this script.")
         return
 
     # Test camera access before running YOLO
-    camera_index = test_camera_access()
+    # Keep the capture opened by the probe instead of reopening the device
+    camera_index, cap = test_camera_access()
     if camera_index is None:
         return
 
@@ -240,20 +342,17 @@ def main():
     setup_folders()
     
     print(f"\nStarting webcam feed using camera {camera_index}...")
-    print("Press 'q' in the video window to quit.")
-    print("A window should appear showing your webcam with gun/threat detection.")
+    if HEADLESS:
+        print("No display detected - running headless. Press Ctrl+C to quit.")
+    else:
+        print("Press 'q' in the video window to quit.")
+        print("A window should appear showing your webcam with gun/threat detection.")
     print("📸 Screenshots will be automatically taken when weapons are detected!")
     print(f"📁 Screenshots will be saved to: {SCREENSHOT_FOLDER}/")
 
     try:
         # Run detection with manual loop for better window control
         print("Starting detection loop...")
-        cap = cv2.VideoCapture(camera_index)
-        
-        if not cap.isOpened():
-            print("✗ Failed to open camera for detection")
-            return
-        
         print("✓ Camera opened successfully for detection")
         print("Press 'q' in the video window to quit, or Ctrl+C in terminal")
         
@@ -265,14 +364,28 @@ def main():
         current_event_group = []
         last_event_time = None
         
+        # Capture on its own thread so camera reads overlap with inference
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        frame_queue = queue.Queue(maxsize=1)
+        stop_event = threading.Event()
+        
+        # Ctrl+C stops capture; the loop then exits through the normal cleanup path
+        def handle_sigint(signum, _frame):
+            print("\nInterrupted by user (Ctrl+C)")
+            stop_event.set()
+        signal.signal(signal.SIGINT, handle_sigint)
+        frame_wanted = threading.Event()
+        capture_thread = threading.Thread(target=capture_loop, args=(cap, frame_queue, stop_event, frame_wanted),
+                                          daemon=True)
+        capture_thread.start()
+        
         while True:
-            ret, frame = cap.read()
-            if not ret:
-                print("✗ Failed to read frame from camera")
+            frame = next_frame(frame_queue, stop_event, frame_wanted)
+            if frame is None:
                 break
             
             # Run YOLO prediction on the frame
-            results = model(frame, conf=CONFIDENCE_THRESHOLD)
+            results = model(frame, conf=CONFIDENCE_THRESHOLD, imgsz=INFERENCE_IMAGE_SIZE, **predict_args)
             
             # Check for weapon detection
             detection_info = check_weapon_detection(results)
@@ -292,15 +405,16 @@ def main():
                 last_screenshot_time = current_time
                 last_event_time = current_time
             
-            # Draw the results on the frame
-            annotated_frame = results[0].plot()
-            
-            # Add screenshot counter to the frame
-            cv2.putText(annotated_frame, f"Screenshots: {screenshot_count}", 
-                       (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            
-            # Display the frame
-            cv2.imshow('Gun/Threat Detection', annotated_frame)
+            if not HEADLESS:
+                # Draw the results on the frame
+                annotated_frame = results[0].plot()
+                
+                # Add screenshot counter to the frame
+                cv2.putText(annotated_frame, f"Screenshots: {screenshot_count}", 
+                           (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+                
+                # Display the frame
+                cv2.imshow('Gun/Threat Detection', annotated_frame)
             
             # Check if we need to process current event group (1 minute timeout)
             if (current_event_group and last_event_time and 
@@ -311,7 +425,7 @@ def main():
                 last_event_time = None
             
             # Break the loop when 'q' is pressed
-            if cv2.waitKey(1) & 0xFF == ord('q'):
+            if not HEADLESS and cv2.waitKey(1) & 0xFF == ord('q'):
                 print("Quit key pressed")
                 break
                 
@@ -322,9 +436,13 @@ def main():
         print("This might be due to camera access issues or the prediction window being closed.")
     finally:
         # Clean up
+        if 'capture_thread' in locals():
+            stop_event.set()
+            capture_thread.join(timeout=2.0)
         if 'cap' in locals():
             cap.release()
-        cv2.destroyAllWindows()
+        if not HEADLESS:
+            cv2.destroyAllWindows()
         
         # Process any remaining event group
         if 'current_event_group' in locals() and current_event_group:
@@ -133,23 +133,9 @@ class ScreenshotManager:
                 
                 # Make phone call with the audio
                 if self.twilio_api.is_enabled():
-                    print(f"\n📞 Making security alert call...")
-                    call_sid = self.twilio_api.make_security_call(audio_path, event_info)
-                    
-                    if call_sid:
-                        print(f"✅ Security call initiated successfully!")
-                        print(f"   Call SID: {call_sid}")
-                        
-                        # Also send SMS as backup
-                        print(f"\n📱 Sending backup SMS alert...")
-                        sms_sid = self.twilio_api.send_security_sms(event_info, audio_path)
-                        if sms_sid:
-                            print(f"✅ Backup SMS sent successfully!")
-                    else:
-                        print(f"❌ Security call failed - sending SMS alert instead...")
-                        sms_sid = self.twilio_api.send_security_sms(event_info, audio_path)
-                        if sms_sid:
-                            print(f"✅ SMS alert sent successfully!")
+                    print(f"\n📞 Making security alert call and sending SMS alert...")
+                    # Fire and forget - call and SMS are dispatched concurrently in the background
+                    self.twilio_api.dispatch_alert(event_info, audio_path)
                 else:
                     print(f"⚠️  Twilio not enabled - skipping phone call")
         
@@ -88,9 +88,10 @@ def detection_thread():
     # Import here to avoid circular imports
     from detection import WeaponDetector
     from screenshot_manager import ScreenshotManager
+    from utils import get_optimal_camera_settings
     
-    # Initialize detector
-    detector = WeaponDetector(MODEL_PATH)
+    # Initialize detector (INT8 model on Raspberry Pi when available)
+    detector = WeaponDetector(get_optimal_camera_settings()['model_path'])
     screenshot_manager = ScreenshotManager()
     
     # Open separate camera instance for detection
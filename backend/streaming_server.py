@@ -5,28 +5,84 @@ from flask import Flask, Response, jsonify, render_template_string
 from flask_cors import CORS
 import cv2
 import numpy as np
+import os
 import time
 import json
-from threading import Thread, Lock
+import atexit
+from dataclasses import dataclass, asdict
+from multiprocessing import shared_memory
+from threading import Thread, Lock, Condition, BoundedSemaphore
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from config import *
 
+# Optional: simplejpeg (the libjpeg-turbo binding picamera2 uses) encodes faster than cv2.imencode
+try:
+    import simplejpeg
+except ImportError:
+    simplejpeg = None
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for frontend access
 
 # Global variables for streaming
-current_frame = None
-detection_data = {
-    'threats': [],
-    'count': 0,
-    'fps': 0,
-    'frame_count': 0,
-    'total_detections': 0,
-    'status': 'initializing',
-    'timestamp': 0
-}
-frame_lock = Lock()
+# Stream frames are encoded by a small worker pool - cv2.resize/imencode release the GIL,
+# so concurrent encodes run on separate cores
+STREAM_ENCODE_WORKERS = max(1, min(4, os.cpu_count() or 1))
+# Frames are published through a small ring of slots backed by shared memory:
+# the producer writes a free slot, then publishes its index under frame_cond.
+# Slots handed to an encode worker are marked busy until it finishes, and the producer
+# never writes a busy slot - two spare slots beyond the in-flight encodes mean one is free.
+FRAME_RING_SIZE = STREAM_ENCODE_WORKERS + 2
+frame_ring_shm = None
+frame_ring = []
+frame_ring_busy = []  # In-flight encodes per slot (guarded by frame_cond)
+retired_frame_rings = []  # Old buffers may still be referenced by the encoder - freed at exit
+current_index = -1
+# Pre-built MJPEG part framing - joined with each frame into a single chunk per part
+_MJPEG_HDR = b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: '
+_MJPEG_SEP = b'\r\n\r\n'
+_MJPEG_END = b'\r\n'
+# Stream rate cap, applied once in the producer so every viewer inherits it
+STREAM_PERIOD_NS = int(1e9 / STREAM_MAX_FPS)
+next_frame_deadline_ns = 0
+frame_seq = 0  # Bumped on every new frame so the encoder can tell fresh frames apart
+frame_cond = Condition()  # Wakes the stream encoder when a new frame lands
+# Encoded JPEG shared by all viewers - each frame is resized and encoded exactly once
+current_jpeg = None
+jpeg_seq = 0
+jpeg_cond = Condition()  # Wakes waiting viewers when a new JPEG is ready
+encoder_thread = None
+encoder_lock = Lock()
+encode_pool = None
+encode_slots = BoundedSemaphore(STREAM_ENCODE_WORKERS)  # Bounds in-flight encodes
+viewer_count = 0  # Connected /video_feed clients - frames are only published while > 0
+viewer_lock = Lock()
+
+@dataclass
+class DetectionState:
+    """Latest detection snapshot served by the API - allocated once and mutated in place"""
+    __slots__ = ('threats', 'count', 'fps', 'frame_count', 'total_detections', 'status', 'timestamp')
+    threats: list
+    count: int
+    fps: float
+    frame_count: int
+    total_detections: int
+    status: str
+    timestamp: float
+
+detection_state = DetectionState(
+    threats=[],
+    count=0,
+    fps=0,
+    frame_count=0,
+    total_detections=0,
+    status='initializing',
+    timestamp=0
+)
 data_lock = Lock()
+detection_version = 0  # Bumped whenever detection_state changes
+_status_cache = (-1, b'')  # (detection_version, serialized status) - swapped atomically
 
 # Global detector reference (will be set by main system)
 detector = None
@@ -38,38 +94,56 @@ def set_detector(detector_instance, screenshot_manager_instance):
     detector = detector_instance
     screenshot_manager = screenshot_manager_instance
 
-def generate_frames():
-    """Ultra-optimized generator function for video streaming"""
-    last_frame_time = 0
-    frame_interval = 1.0 / STREAM_MAX_FPS
-    skip_counter = 0
+def _allocate_frame_ring(shape, dtype):
+    """Allocate the shared-memory frame ring for frames of the given shape - caller must hold frame_cond"""
+    global frame_ring_shm, frame_ring, frame_ring_busy, current_index
+    current_index = -1
+    # Encodes still running on the old ring release their slots in the old busy list
+    frame_ring_busy = [0] * FRAME_RING_SIZE
+    if frame_ring_shm is not None:
+        retired_frame_rings.append(frame_ring_shm)
     
-    while True:
-        current_time = time.time()
-        
-        # Skip frames if updating too frequently
-        if current_time - last_frame_time < frame_interval:
-            time.sleep(0.005)  # Longer sleep to reduce CPU usage
-            continue
-        
-        # Additional frame skipping for streaming
-        skip_counter += 1
-        if skip_counter <= STREAMING_SKIP_FRAMES:
-            continue
-        skip_counter = 0
-            
-        # Try to get frame without blocking
+    slot_bytes = int(np.prod(shape)) * np.dtype(dtype).itemsize
+    frame_ring_shm = shared_memory.SharedMemory(create=True, size=slot_bytes * FRAME_RING_SIZE)
+    frame_ring = [np.ndarray(shape, dtype=dtype, buffer=frame_ring_shm.buf, offset=i * slot_bytes)
+                  for i in range(FRAME_RING_SIZE)]
+
+@atexit.register
+def _release_frame_ring():
+    """Free the shared-memory frame ring"""
+    global frame_ring
+    frame_ring = []
+    for shm in retired_frame_rings + ([frame_ring_shm] if frame_ring_shm is not None else []):
         try:
-            with frame_lock:
-                if current_frame is None:
-                    time.sleep(0.02)
-                    continue
-                # Use reference instead of copy for speed
-                frame = current_frame
-        except:
-            time.sleep(0.01)
-            continue
-        
+            shm.unlink()
+            shm.close()
+        except (BufferError, FileNotFoundError):
+            pass
+
+def encode_jpeg(frame, quality=40):
+    """Encode a BGR frame to JPEG bytes, preferring simplejpeg over cv2.imencode"""
+    if simplejpeg is not None:
+        return simplejpeg.encode_jpeg(frame, quality=quality, colorspace='BGR', fastdct=True)
+    
+    # Baseline JPEG keeps libjpeg-turbo on its SIMD path
+    ret, buffer = cv2.imencode('.jpg', frame, [
+        cv2.IMWRITE_JPEG_QUALITY, quality,
+        cv2.IMWRITE_JPEG_OPTIMIZE, 1
+    ])
+    return buffer.tobytes() if ret else None
+
+def _free_ring_slot():
+    """Next ring slot that is neither published nor being encoded, or None - caller must hold frame_cond"""
+    for offset in range(1, FRAME_RING_SIZE + 1):
+        index = (current_index + offset) % FRAME_RING_SIZE
+        if index != current_index and not frame_ring_busy[index]:
+            return index
+    return None
+
+def encode_stream_frame(frame, seq, ring_busy, index):
+    """Resize and encode one frame, then broadcast it unless a newer JPEG already went out"""
+    global current_jpeg, jpeg_seq
+    try:
         # Resize to maintain proper aspect ratio based on camera resolution
         # Calculate proportional size based on camera resolution
         original_height, original_width = frame.shape[:2]
@@ -82,34 +156,102 @@ def generate_frames():
         small_frame = cv2.resize(frame, (target_width, target_height))
         
         # Encode with very low quality for speed
-        ret, buffer = cv2.imencode('.jpg', small_frame, [
-            cv2.IMWRITE_JPEG_QUALITY, 40,  # Very low quality
-            cv2.IMWRITE_JPEG_OPTIMIZE, 1,
-            cv2.IMWRITE_JPEG_PROGRESSIVE, 1
-        ])
-        
-        if not ret:
-            continue
-        
-        frame_bytes = buffer.tobytes()
+        frame_bytes = encode_jpeg(small_frame, quality=40)
+        if frame_bytes is None:
+            return
         
-        # Yield frame
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-        
-        last_frame_time = current_time
+        # Workers may finish out of order - never replace a newer frame with an older one
+        with jpeg_cond:
+            if seq > jpeg_seq:
+                current_jpeg = frame_bytes
+                jpeg_seq = seq
+                jpeg_cond.notify_all()
+    except Exception as e:
+        print(f"❌ Stream encode error: {e}")
+    finally:
+        # Hand the ring slot back to the producer
+        with frame_cond:
+            ring_busy[index] -= 1
+        encode_slots.release()
+
+def stream_encoder_loop():
+    """Hand each published frame to the encode workers, dropping it if all of them are busy"""
+    last_seq = 0
+    
+    while True:
+        # Sleep until the producer publishes a new frame (already rate-capped upstream)
+        with frame_cond:
+            frame_cond.wait_for(lambda: frame_seq != last_seq)
+            last_seq = frame_seq
+            index = current_index
+            if index < 0:
+                continue
+            if not encode_slots.acquire(blocking=False):
+                continue  # Every worker is busy - skip to a fresher frame
+            
+            # Mark the slot busy before releasing the lock so the producer can't overwrite it mid-encode
+            ring_busy = frame_ring_busy
+            ring_busy[index] += 1
+            frame = frame_ring[index]
+        encode_pool.submit(encode_stream_frame, frame, last_seq, ring_busy, index)
+
+def ensure_stream_encoder():
+    """Start the shared encoder thread and worker pool on first use"""
+    global encoder_thread, encode_pool
+    with encoder_lock:
+        if encoder_thread is None:
+            encode_pool = ThreadPoolExecutor(max_workers=STREAM_ENCODE_WORKERS)
+            encoder_thread = Thread(target=stream_encoder_loop, daemon=True)
+            encoder_thread.start()
+
+def generate_frames():
+    """Ultra-optimized generator function for video streaming"""
+    global viewer_count
+    ensure_stream_encoder()
+    last_seq = 0
+    
+    with viewer_lock:
+        viewer_count += 1
+    try:
+        while True:
+            # Viewers only forward the shared JPEG - a slow client just skips to the latest frame
+            with jpeg_cond:
+                jpeg_cond.wait_for(lambda: jpeg_seq != last_seq)
+                last_seq = jpeg_seq
+                frame_bytes = current_jpeg
+            
+            # Yield frame as one multipart part (Content-Length lets browsers render it immediately).
+            # One item per part - the dev server writes and flushes every yielded item separately.
+            yield b''.join((_MJPEG_HDR, str(len(frame_bytes)).encode(), _MJPEG_SEP, frame_bytes, _MJPEG_END))
+    finally:
+        with viewer_lock:
+            viewer_count -= 1
 
 def update_streaming_frame(frame, detection_info, fps, frame_count, total_detections):
     """Update the current frame and detection data for streaming"""
-    global current_frame, detection_data
+    global detection_version, frame_seq, current_index, next_frame_deadline_ns
     
-    # Only update if we don't already have a frame or if enough time has passed
-    try:
-        with frame_lock:
-            # Use reference instead of copy for speed - be careful with this!
-            current_frame = frame
-    except:
-        pass  # Skip if lock fails
+    # Cap the stream at STREAM_MAX_FPS - frames carrying a detection overlay are always published.
+    # Nothing is copied or encoded while no viewer is connected; detection data is still updated below.
+    now_ns = time.monotonic_ns()
+    if viewer_count > 0 and (detection_info or now_ns >= next_frame_deadline_ns):
+        next_frame_deadline_ns += STREAM_PERIOD_NS
+        if next_frame_deadline_ns <= now_ns:
+            next_frame_deadline_ns = now_ns + STREAM_PERIOD_NS  # Fell behind - resync instead of bursting
+        
+        # Write into a free ring slot so the encoder never sees the producer's buffer being reused
+        with frame_cond:
+            if not frame_ring or frame_ring[0].shape != frame.shape or frame_ring[0].dtype != frame.dtype:
+                _allocate_frame_ring(frame.shape, frame.dtype)
+            next_index = _free_ring_slot()
+        
+        # No free slot (can't happen while encodes are bounded by encode_slots) - drop the frame
+        if next_index is not None:
+            np.copyto(frame_ring[next_index], frame)
+            with frame_cond:
+                current_index = next_index
+                frame_seq += 1
+                frame_cond.notify_all()
     
     # Prepare detection data
     threats = []
@@ -122,15 +264,14 @@ def update_streaming_frame(frame, detection_info, fps, frame_count, total_detect
             })
     
     with data_lock:
-        detection_data = {
-            'threats': threats,
-            'count': len(threats),
-            'fps': round(fps, 2),
-            'frame_count': frame_count,
-            'total_detections': total_detections,
-            'status': 'threat_detected' if len(threats) > 0 else 'monitoring',
-            'timestamp': time.time()
-        }
+        detection_state.threats = threats
+        detection_state.count = len(threats)
+        detection_state.fps = round(fps, 2)
+        detection_state.frame_count = frame_count
+        detection_state.total_detections = total_detections
+        detection_state.status = 'threat_detected' if len(threats) > 0 else 'monitoring'
+        detection_state.timestamp = time.time()
+        detection_version += 1
 
 # --- API ENDPOINTS ---
 
@@ -367,17 +508,24 @@ def video_feed():
 @app.route('/api/status')
 def get_status():
     """Get current detection status"""
-    with data_lock:
-        return jsonify(detection_data)
+    global _status_cache
+    
+    # Serialize once per detection update and share the bytes across all polling clients
+    cached = _status_cache
+    if cached[0] != detection_version:
+        with data_lock:
+            cached = (detection_version, json.dumps(asdict(detection_state)).encode())
+        _status_cache = cached
+    return Response(cached[1], mimetype='application/json')
 
 @app.route('/api/threats')
 def get_threats():
     """Get current threat detections"""
     with data_lock:
         return jsonify({
-            'threats': detection_data.get('threats', []),
-            'count': detection_data.get('count', 0),
-            'timestamp': detection_data.get('timestamp', 0)
+            'threats': detection_state.threats,
+            'count': detection_state.count,
+            'timestamp': detection_state.timestamp
         })
 
 @app.route('/health')
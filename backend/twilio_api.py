@@ -2,16 +2,207 @@
 # Twilio Voice API integration for security alert phone calls
 
 import os
-import requests
-from twilio.rest import Client
+from string import Template
+from collections import deque
+from threading import Thread, Timer, Lock
+from functools import partial
+from urllib.parse import quote, urlsplit
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from concurrent.futures import ThreadPoolExecutor, Future
 from config import *
 
 
+# Local audio server - Twilio fetches the saved ElevenLabs MP3s from here for <Play>.
+# AUDIO_PUBLIC_URL must be the address Twilio can reach (e.g. an ngrok tunnel to AUDIO_SERVER_PORT);
+# without it the server isn't started and calls use text-to-speech.
+AUDIO_SERVER_PORT = int(os.getenv('AUDIO_SERVER_PORT', '8765'))
+# Interface the audio server listens on - the default keeps it local for a tunnel;
+# set 0.0.0.0 only when Twilio must reach this machine directly
+AUDIO_SERVER_HOST = os.getenv('AUDIO_SERVER_HOST', '127.0.0.1')
+AUDIO_PUBLIC_URL = os.getenv('AUDIO_PUBLIC_URL', '').rstrip('/')
+
+# Security calls requested within this many seconds of the last call are merged into one call
+CALL_COALESCE_WINDOW = 10.0
+
+# XML escape table - str.translate escapes all five characters in a single pass
+_XML_ESCAPE = str.maketrans({
+    '&': '&amp;',
+    '<': '&lt;',
+    '>': '&gt;',
+    '"': '&quot;',
+    "'": '&#39;'
+})
+
+# TwiML building blocks
+_TWIML_HEADER = '''<?xml version="1.0" encoding="UTF-8"?>
+<Response>
+    <Say voice="alice">Security Alert. This is an automated security system calling to report a weapon detection event.</Say>
+    <Pause length="2"/>'''
+
+_TWIML_FOOTER = '''
+    <Say voice="alice">Please review the security footage immediately. This call will now end.</Say>
+    <Pause length="1"/>
+    <Say voice="alice">Goodbye.</Say>
+</Response>'''
+
+# Complete security call documents, prebaked once per variant so each call is a single substitution
+_TWIML_SECURITY_CALL = {
+    'message': Template(_TWIML_HEADER + '''
+    <Say voice="alice">Security Analysis: $message</Say>
+    <Pause length="2"/>''' + _TWIML_FOOTER),
+    'audio': Template(_TWIML_HEADER + '''
+    <Say voice="alice">Playing detailed security analysis.</Say>
+    <Play>$audio_url</Play>
+    <Pause length="1"/>''' + _TWIML_FOOTER),
+    'none': Template(_TWIML_HEADER + '''
+    <Say voice="alice">Weapon detection event detected. Please review security footage immediately.</Say>
+    <Pause length="2"/>''' + _TWIML_FOOTER),
+}
+
+_TWIML_TEST_CALL = '''<?xml version="1.0" encoding="UTF-8"?>
+<Response>
+    <Say voice="alice">This is a test call from your security system. Twilio integration is working correctly.</Say>
+    <Pause length="1"/>
+    <Say voice="alice">Goodbye.</Say>
+</Response>'''
+
+_TWIML_SIMPLE_CALL = Template('''<?xml version="1.0" encoding="UTF-8"?>
+<Response>
+    <Say voice="alice">$message</Say>
+    <Pause length="1"/>
+    <Say voice="alice">Goodbye.</Say>
+</Response>''')
+
+
+class _AudioRequestHandler(SimpleHTTPRequestHandler):
+    """
+    Serves only the MP3 announcements, so screenshots in the same folder stay private.
+    """
+    
+    def _is_audio_request(self):
+        """
+        Check the file that would actually be served - translate_path ignores the query
+        string and fragment, so they must not count towards the extension check.
+        """
+        return os.path.splitext(urlsplit(self.path).path)[1].lower() == '.mp3'
+    
+    def do_GET(self):
+        if not self._is_audio_request():
+            self.send_error(404)
+            return
+        super().do_GET()
+    
+    def do_HEAD(self):
+        if not self._is_audio_request():
+            self.send_error(404)
+            return
+        super().do_HEAD()
+    
+    def list_directory(self, path):
+        self.send_error(404)
+        return None
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def _create_http_client():
+    """
+    Build the HTTP transport for the Twilio client - httpx over HTTP/2 when installed,
+    so the call, SMS and status requests share a single TLS connection, otherwise a
+    pooled requests session. The Twilio SDK is imported here rather than at module
+    level so deployments with Twilio disabled never pay for loading it.
+    """
+    from twilio.http.http_client import TwilioHttpClient
+    
+    # Optional: httpx with HTTP/2 multiplexes concurrent Twilio requests over one TLS connection
+    try:
+        import httpx
+        from twilio.http.response import Response
+    except ImportError:
+        httpx = None
+    
+    if httpx is not None:
+        class HttpxTwilioClient(TwilioHttpClient):
+            """
+            Twilio HTTP client that sends requests through httpx over HTTP/2.
+            """
+            
+            def __init__(self):
+                super().__init__(pool_connections=False)
+                # http2=True raises ImportError here when the h2 package is missing
+                self._httpx = httpx.Client(http2=True, limits=httpx.Limits(max_keepalive_connections=8))
+            
+            def request(self, method, url, params=None, data=None, headers=None, auth=None, timeout=None,
+                        allow_redirects=False):
+                """
+                Make an HTTP request and wrap the result in a Twilio Response.
+                """
+                response = self._httpx.request(
+                    method.upper(), url,
+                    params=params,
+                    data=data,
+                    headers=headers,
+                    auth=auth,
+                    timeout=timeout if timeout is not None else self.timeout,
+                    follow_redirects=allow_redirects
+                )
+                return Response(response.status_code, response.text, response.headers)
+        
+        try:
+            return HttpxTwilioClient()
+        except ImportError:
+            print("⚠️  httpx HTTP/2 support missing (pip install 'httpx[http2]') - using requests")
+    
+    from requests.adapters import HTTPAdapter
+    http_client = TwilioHttpClient(pool_connections=True)
+    http_client.session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=10))
+    return http_client
+
+
 class TwilioVoiceCall:
     """
     Handles phone calls using Twilio Voice API.
     """
     
+    # Process-wide Twilio client so every call/SMS reuses the same keep-alive HTTPS connections
+    _shared_client = None
+    
+    # Process-wide audio server (one per process, however many instances are created)
+    _audio_server = None
+    
+    @classmethod
+    def get_client(cls, account_sid, auth_token):
+        """
+        Return the shared Twilio client, creating it on first use with an HTTP/2 httpx
+        transport when available, or a pooled requests session otherwise.
+        """
+        if cls._shared_client is None:
+            # Imported on first use - only reached when Twilio is enabled
+            from twilio.rest import Client
+            cls._shared_client = Client(account_sid, auth_token, http_client=_create_http_client())
+        return cls._shared_client
+    
+    @classmethod
+    def start_audio_server(cls, directory):
+        """
+        Serve the audio folder over HTTP on a daemon thread, starting it on first use.
+        
+        Returns:
+            True if the server is running
+        """
+        if cls._audio_server is None:
+            try:
+                handler = partial(_AudioRequestHandler, directory=directory)
+                cls._audio_server = ThreadingHTTPServer((AUDIO_SERVER_HOST, AUDIO_SERVER_PORT), handler)
+                cls._audio_server.daemon_threads = True
+                Thread(target=cls._audio_server.serve_forever, daemon=True).start()
+                print(f"🎵 Audio server started on {AUDIO_SERVER_HOST}:{AUDIO_SERVER_PORT} ({AUDIO_PUBLIC_URL})")
+            except OSError as e:
+                print(f"❌ Failed to start audio server: {e}")
+                return False
+        return True
+    
     def __init__(self):
         """
         Initialize the Twilio client.
@@ -22,6 +213,14 @@ class TwilioVoiceCall:
         self.target_phone = TARGET_PHONE_NUMBER
         self.enabled = TWILIO_ENABLED
         
+        # Twilio REST round-trips run here so the detection thread never blocks on them
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='twilio')
+        
+        # Security calls waiting for the current coalescing window to close
+        self._pending_calls = deque()
+        self._pending_lock = Lock()
+        self._call_window_timer = None
+        
         if self.enabled and (self.account_sid == 'YOUR_TWILIO_ACCOUNT_SID' or 
                            self.auth_token == 'YOUR_TWILIO_AUTH_TOKEN'):
             print("⚠️  Twilio credentials not configured. Set TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN in .env file to enable phone calls.")
@@ -30,11 +229,16 @@ class TwilioVoiceCall:
         # Initialize the Twilio client
         if self.enabled:
             try:
-                self.client = Client(self.account_sid, self.auth_token)
+                self.client = self.get_client(self.account_sid, self.auth_token)
                 print("✅ Twilio client initialized successfully!")
             except Exception as e:
                 print(f"❌ Failed to initialize Twilio client: {e}")
                 self.enabled = False
+        
+        # Serve saved announcements so calls can play them instead of text-to-speech
+        self.audio_dir = os.path.abspath(SCREENSHOT_FOLDER)
+        self.audio_server_enabled = bool(self.enabled and AUDIO_PUBLIC_URL and
+                                         self.start_audio_server(self.audio_dir))
     
     def is_enabled(self):
         """
@@ -44,29 +248,29 @@ class TwilioVoiceCall:
     
     def upload_audio_to_twilio(self, audio_file_path):
         """
-        Upload audio file to a web-accessible URL for Twilio to play.
-        For now, we'll use a simple approach, but in production you'd want to:
-        1. Host the file on your web server, or
-        2. Use Twilio's Media API, or
-        3. Use a cloud storage service like AWS S3
+        Get a web-accessible URL for an audio file so Twilio can play it.
+        Files in the audio folder are served by the local audio server at AUDIO_PUBLIC_URL.
         
         Args:
             audio_file_path: Path to the MP3 audio file
             
         Returns:
-            Web-accessible URL for the audio file
+            Web-accessible URL for the audio file, or None if it can't be served
         """
-        if not os.path.exists(audio_file_path):
+        if not audio_file_path or not os.path.exists(audio_file_path):
             print(f"❌ Audio file not found: {audio_file_path}")
             return None
         
-        # For now, we'll create a simple web server approach
-        # In production, you'd upload this to a web server or cloud storage
-        print(f"⚠️  Audio file available locally: {os.path.basename(audio_file_path)}")
-        print(f"   Note: For production, upload this to a web-accessible URL")
+        if not self.audio_server_enabled:
+            print(f"⚠️  Audio file available locally: {os.path.basename(audio_file_path)}")
+            print(f"   Note: Set AUDIO_PUBLIC_URL to let Twilio play it")
+            return None
         
-        # Return None for now - we'll use text-to-speech instead
-        return None
+        if os.path.dirname(os.path.abspath(audio_file_path)) != self.audio_dir:
+            print(f"⚠️  Audio file is outside the served folder: {audio_file_path}")
+            return None
+        
+        return f"{AUDIO_PUBLIC_URL}/{quote(os.path.basename(audio_file_path))}"
     
     def create_twiml_response(self, audio_url=None, security_message=None):
         """
@@ -79,45 +283,91 @@ class TwilioVoiceCall:
         Returns:
             TwiML XML string
         """
-        twiml = '''<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Say voice="alice">Security Alert. This is an automated security system calling to report a weapon detection event.</Say>
-    <Pause length="2"/>'''
-        
+        # Escape XML special characters
         if security_message:
-            # Escape XML special characters
-            security_message = security_message.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;').replace("'", '&#39;')
-            twiml += f'''
-    <Say voice="alice">Security Analysis: {security_message}</Say>
-    <Pause length="2"/>'''
-        elif audio_url:
-            twiml += f'''
-    <Say voice="alice">Playing detailed security analysis.</Say>
-    <Play>{audio_url}</Play>
-    <Pause length="1"/>'''
-        else:
-            twiml += '''
-    <Say voice="alice">Weapon detection event detected. Please review security footage immediately.</Say>
-    <Pause length="2"/>'''
-        
-        twiml += '''
-    <Say voice="alice">Please review the security footage immediately. This call will now end.</Say>
-    <Pause length="1"/>
-    <Say voice="alice">Goodbye.</Say>
-</Response>'''
-        
-        return twiml
+            return _TWIML_SECURITY_CALL['message'].substitute(message=security_message.translate(_XML_ESCAPE))
+        if audio_url:
+            return _TWIML_SECURITY_CALL['audio'].substitute(audio_url=audio_url.translate(_XML_ESCAPE))
+        return _TWIML_SECURITY_CALL['none'].template
     
     def make_security_call(self, audio_file_path, event_info):
         """
-        Make a phone call and play the security announcement.
+        Make a phone call and play the security announcement in the background.
+        The first alert is called immediately; alerts arriving within CALL_COALESCE_WINDOW
+        seconds of a call are held and summarized in a single call when the window closes,
+        so a burst of detections never places more than one call per window.
         
         Args:
             audio_file_path: Path to the MP3 audio file with security announcement
             event_info: Event metadata for call context
             
         Returns:
-            Call SID if successful, None if failed
+            Future resolving to the call SID if successful, None if failed
+        """
+        with self._pending_lock:
+            if self._call_window_timer is not None:
+                future = Future()
+                self._pending_calls.append((audio_file_path, event_info, future))
+                return future
+            self._start_call_window()
+        return self._executor.submit(self._make_security_call_sync, audio_file_path, event_info)
+    
+    def _start_call_window(self):
+        """
+        Open a coalescing window - caller must hold _pending_lock.
+        """
+        self._call_window_timer = Timer(CALL_COALESCE_WINDOW, self._flush_security_calls)
+        self._call_window_timer.daemon = True
+        self._call_window_timer.start()
+    
+    def flush_pending_calls(self):
+        """
+        Place the call for alerts still held in the coalescing window right away, blocking
+        until it has been made. Call before exiting - the window timer is a daemon thread,
+        so held alerts would otherwise be dropped with the process.
+        """
+        with self._pending_lock:
+            timer = self._call_window_timer
+        if timer is not None:
+            timer.cancel()
+        self._flush_security_calls(reopen_window=False)
+    
+    def _flush_security_calls(self, reopen_window=True):
+        """
+        Close the coalescing window, placing one call for every alert held during it.
+        """
+        with self._pending_lock:
+            batch = list(self._pending_calls)
+            self._pending_calls.clear()
+            # A call placed now opens a new window; otherwise the next alert calls immediately
+            self._call_window_timer = None
+            if batch and reopen_window:
+                self._start_call_window()
+        
+        if not batch:
+            return
+        
+        if len(batch) == 1:
+            audio_file_path, event_info, _ = batch[0]
+        else:
+            print(f"📞 Coalescing {len(batch)} security alerts into one call")
+            events = [info for _, info, _ in batch]
+            # The saved announcements each describe a single event, so speak the summary instead
+            audio_file_path = None
+            event_info = {
+                'weapons': sorted(set().union(*(info.get('weapons', []) for info in events))),
+                'duration': sum(info.get('duration', 0) for info in events),
+                'screenshot_count': sum(info.get('screenshot_count', 0) for info in events),
+                'timestamp': events[-1].get('timestamp', 'Unknown')
+            }
+        
+        call_sid = self._make_security_call_sync(audio_file_path, event_info)
+        for _, _, future in batch:
+            future.set_result(call_sid)
+    
+    def _make_security_call_sync(self, audio_file_path, event_info):
+        """
+        Blocking implementation of make_security_call - returns the call SID or None.
         """
         if not self.is_enabled():
             print("⚠️  Twilio not enabled - cannot make phone call")
@@ -127,23 +377,27 @@ class TwilioVoiceCall:
             print(f"📞 Making security alert call to {self.target_phone}...")
             
             # Try to get a web-accessible URL for the audio
-            audio_url = self.upload_audio_to_twilio(audio_file_path)
-            
-            # For now, let's use a custom security message instead of audio file
-            # Extract key information from event_info for the call
-            weapons = event_info.get('weapons', [])
-            duration = event_info.get('duration', 0)
-            screenshot_count = event_info.get('screenshot_count', 0)
-            
-            security_message = f"""
-            Detected weapons: {', '.join(weapons) if weapons else 'Unknown weapons'}.
-            Event duration: {duration:.1f} seconds.
-            Number of detection frames: {screenshot_count}.
-            Please review security footage immediately.
-            """
-            
-            # Create TwiML response with custom message
-            twiml_response = self.create_twiml_response(audio_url=None, security_message=security_message)
+            audio_url = self.upload_audio_to_twilio(audio_file_path) if audio_file_path else None
+            
+            if audio_url:
+                # Play the saved ElevenLabs announcement
+                twiml_response = self.create_twiml_response(audio_url=audio_url)
+            else:
+                # Fall back to a custom security message spoken by Twilio
+                # Extract key information from event_info for the call
+                weapons = event_info.get('weapons', [])
+                duration = event_info.get('duration', 0)
+                screenshot_count = event_info.get('screenshot_count', 0)
+                
+                security_message = f"""
+                Detected weapons: {', '.join(weapons) if weapons else 'Unknown weapons'}.
+                Event duration: {duration:.1f} seconds.
+                Number of detection frames: {screenshot_count}.
+                Please review security footage immediately.
+                """
+                
+                # Create TwiML response with custom message
+                twiml_response = self.create_twiml_response(audio_url=None, security_message=security_message)
             
             # Make the call
             call = self.client.calls.create(
@@ -157,7 +411,10 @@ class TwilioVoiceCall:
             print(f"   To: {self.target_phone}")
             print(f"   From: {self.twilio_phone}")
             print(f"   Status: {call.status}")
-            print(f"   Audio: Using custom security message (ElevenLabs audio saved locally)")
+            if audio_url:
+                print(f"   Audio: Playing ElevenLabs announcement from {audio_url}")
+            else:
+                print(f"   Audio: Using custom security message (ElevenLabs audio saved locally)")
             
             return call.sid
             
@@ -175,7 +432,13 @@ class TwilioVoiceCall:
             event_info: Event metadata
             
         Returns:
-            Call SID if successful, None if failed
+            Future resolving to the call SID if successful, None if failed
+        """
+        return self._executor.submit(self._make_call_with_elevenlabs_audio_sync, audio_file_path, event_info)
+    
+    def _make_call_with_elevenlabs_audio_sync(self, audio_file_path, event_info):
+        """
+        Blocking implementation of make_call_with_elevenlabs_audio.
         """
         if not self.is_enabled():
             print("⚠️  Twilio not enabled - cannot make phone call")
@@ -184,22 +447,13 @@ class TwilioVoiceCall:
         try:
             print(f"📞 Making call with ElevenLabs audio to {self.target_phone}...")
             
-            # For this to work, you need to:
-            # 1. Host the audio file on a web server
-            # 2. Or upload it to cloud storage (AWS S3, Google Cloud, etc.)
-            # 3. Or use Twilio's Media API
-            
-            # Example: If you had the audio hosted at a URL:
-            # audio_url = "https://your-server.com/audio/security_announcement.mp3"
+            if not self.audio_server_enabled:
+                print("⚠️  To play ElevenLabs audio in calls, set AUDIO_PUBLIC_URL to a public")
+                print(f"   address (e.g. an ngrok tunnel) forwarding to port {AUDIO_SERVER_PORT}")
+                print("   For now, using text-to-speech with security details...")
             
-            print("⚠️  To play ElevenLabs audio in calls, you need to:")
-            print("   1. Host the audio file on a web server")
-            print("   2. Or use cloud storage (AWS S3, Google Cloud, etc.)")
-            print("   3. Or implement Twilio's Media API")
-            print("   For now, using text-to-speech with security details...")
-            
-            # Fall back to the regular method
-            return self.make_security_call(audio_file_path, event_info)
+            # The regular method plays the audio when it can be served
+            return self._make_security_call_sync(audio_file_path, event_info)
             
         except Exception as e:
             print(f"❌ Error making call with ElevenLabs audio: {e}")
@@ -207,14 +461,20 @@ class TwilioVoiceCall:
     
     def send_security_sms(self, event_info, audio_file_path=None):
         """
-        Send SMS alert as backup if call fails.
+        Send SMS alert as backup if call fails, in the background.
         
         Args:
             event_info: Event metadata
             audio_file_path: Optional path to audio file
             
         Returns:
-            Message SID if successful, None if failed
+            Future resolving to the message SID if successful, None if failed
+        """
+        return self._executor.submit(self._send_security_sms_sync, event_info, audio_file_path)
+    
+    def _send_security_sms_sync(self, event_info, audio_file_path=None):
+        """
+        Blocking implementation of send_security_sms - returns the message SID or None.
         """
         if not self.is_enabled():
             print("⚠️  Twilio not enabled - cannot send SMS")
@@ -257,6 +517,23 @@ Timestamp: {event_info.get('timestamp', 'Unknown')}
             print(f"❌ Error sending security SMS: {e}")
             return None
     
+    def dispatch_alert(self, event_info, audio_file_path=None):
+        """
+        Place the security call and send the SMS alert concurrently.
+        The SMS goes out either way (as backup or as fallback), so there is no need
+        to wait for the call before sending it - alert latency becomes max(call, SMS).
+        
+        Args:
+            event_info: Event metadata
+            audio_file_path: Optional path to the MP3 audio file
+            
+        Returns:
+            (call_future, sms_future) resolving to the call and message SIDs (None on failure)
+        """
+        call_future = self.make_security_call(audio_file_path, event_info)
+        sms_future = self._executor.submit(self._send_security_sms_sync, event_info, audio_file_path)
+        return call_future, sms_future
+    
     def get_call_status(self, call_sid):
         """
         Check the status of a call.
@@ -279,7 +556,16 @@ Timestamp: {event_info.get('timestamp', 'Unknown')}
     
     def test_twilio_setup(self):
         """
-        Test Twilio configuration by making a test call.
+        Test Twilio configuration by making a test call in the background.
+        
+        Returns:
+            Future resolving to True if the test call was initiated, False otherwise
+        """
+        return self._executor.submit(self._test_twilio_setup_sync)
+    
+    def _test_twilio_setup_sync(self):
+        """
+        Blocking implementation of test_twilio_setup.
         """
         if not self.is_enabled():
             print("⚠️  Twilio not enabled - cannot test setup")
@@ -288,12 +574,7 @@ Timestamp: {event_info.get('timestamp', 'Unknown')}
         try:
             print("🧪 Testing Twilio setup with a test call...")
             
-            twiml_response = '''<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Say voice="alice">This is a test call from your security system. Twilio integration is working correctly.</Say>
-    <Pause length="1"/>
-    <Say voice="alice">Goodbye.</Say>
-</Response>'''
+            twiml_response = _TWIML_TEST_CALL
             
             call = self.client.calls.create(
                 twiml=twiml_response,
@@ -311,13 +592,19 @@ Timestamp: {event_info.get('timestamp', 'Unknown')}
     
     def make_simple_call(self, message="This is a test call from your security system."):
         """
-        Make a simple call with just a text message.
+        Make a simple call with just a text message, in the background.
         
         Args:
             message: Text message to speak during the call
             
         Returns:
-            Call SID if successful, None if failed
+            Future resolving to the call SID if successful, None if failed
+        """
+        return self._executor.submit(self._make_simple_call_sync, message)
+    
+    def _make_simple_call_sync(self, message):
+        """
+        Blocking implementation of make_simple_call.
         """
         if not self.is_enabled():
             print("⚠️  Twilio not enabled - cannot make call")
@@ -327,14 +614,7 @@ Timestamp: {event_info.get('timestamp', 'Unknown')}
             print(f"📞 Making simple call to {self.target_phone}...")
             
             # Escape XML special characters in the message
-            message = message.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;').replace('"', '&quot;').replace("'", '&#39;')
-            
-            twiml_response = f'''<?xml version="1.0" encoding="UTF-8"?>
-<Response>
-    <Say voice="alice">{message}</Say>
-    <Pause length="1"/>
-    <Say voice="alice">Goodbye.</Say>
-</Response>'''
+            twiml_response = _TWIML_SIMPLE_CALL.substitute(message=message.translate(_XML_ESCAPE))
             
             call = self.client.calls.create(
                 twiml=twiml_response,
@@ -5,53 +5,176 @@ import cv2
 import os
 import sys
 import platform
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from config import *
 
 
+# Remembers the last working camera index so later runs can skip the full scan
+CAMERA_INDEX_CACHE_FILE = os.path.expanduser('~/.aeye_camera_index')
+
+# INT8 TFLite export of the model for Raspberry Pi (created by export_int8_model.py)
+INT8_MODEL_PATH = os.path.splitext(MODEL_PATH)[0] + '_int8.tflite'
+
+# Input size baked into the static INT8 model - inference must use the same size
+INT8_IMAGE_SIZE = 320
+
+
+def load_cached_camera_index():
+    """
+    Return the camera index saved by a previous run, or None.
+    """
+    try:
+        with open(CAMERA_INDEX_CACHE_FILE, 'r') as f:
+            return int(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def save_cached_camera_index(camera_index):
+    """
+    Persist the working camera index for the next run.
+    """
+    try:
+        with open(CAMERA_INDEX_CACHE_FILE, 'w') as f:
+            f.write(str(camera_index))
+    except OSError:
+        pass
+
+
+def get_camera_backend():
+    """
+    Pick the OpenCV capture backend for this platform explicitly,
+    which skips OpenCV's slow backend autodetection on every open.
+    """
+    system = platform.system()
+    if system == 'Linux':
+        return cv2.CAP_V4L2
+    if system == 'Windows':
+        return cv2.CAP_DSHOW
+    if system == 'Darwin':
+        return cv2.CAP_AVFOUNDATION
+    return cv2.CAP_ANY
+
+
+def list_camera_indices():
+    """
+    List the camera indices worth probing.
+    On Linux only existing /dev/videoN nodes are returned, so absent devices never trigger a driver open.
+    """
+    sysfs_dir = '/sys/class/video4linux'
+    if platform.system() == 'Linux' and os.path.isdir(sysfs_dir):
+        indices = sorted(int(name[5:]) for name in os.listdir(sysfs_dir)
+                         if name.startswith('video') and name[5:].isdigit())
+        return [index for index in indices if index < MAX_CAMERA_INDEX]
+    return list(range(MAX_CAMERA_INDEX))
+
+
+def open_camera(camera_device):
+    """
+    Open a camera and check that it delivers a frame.
+    Returns the open capture on success, None otherwise.
+    """
+    cap = cv2.VideoCapture(camera_device, get_camera_backend())
+    if cap.isOpened():
+        ret, frame = cap.read()
+        if ret and frame is not None:
+            return cap
+    cap.release()
+    return None
+
+
+def _release_probe(future):
+    """
+    Release a capture opened by a probe that lost the race.
+    """
+    cap = future.result()
+    if cap is not None:
+        cap.release()
+
+
+def probe_camera_indices(indices):
+    """
+    Open all candidate indices concurrently; the first camera to deliver a frame wins.
+    Returns (camera_index, cap) with the capture left open, or (None, None).
+    """
+    if not indices:
+        return None, None
+    
+    executor = ThreadPoolExecutor(max_workers=len(indices), thread_name_prefix='camera-probe')
+    futures = {executor.submit(open_camera, index): index for index in indices}
+    winner = None
+    for future in as_completed(futures):
+        if future.result() is not None:
+            winner = future
+            break
+        print(f"✗ Camera {futures[future]} is not accessible")
+    
+    # Close every other camera as soon as its probe finishes, without waiting here
+    for future in futures:
+        if future is not winner:
+            future.add_done_callback(_release_probe)
+    executor.shutdown(wait=False)
+    
+    if winner is None:
+        return None, None
+    return futures[winner], winner.result()
+
+
 def test_camera_access():
     """
     Test if webcam is accessible by trying to open it with OpenCV.
     Supports both regular webcams and Raspberry Pi cameras.
+    The working index is remembered across runs so the scan can usually be skipped.
+    
+    Returns:
+        (camera_device, cap) with the capture left open, or (None, None) if no camera works
     """
     print("Testing camera access...")
     
     # First try Raspberry Pi camera device if specified (Linux only)
     if CAMERA_DEVICE and CAMERA_DEVICE.startswith('/dev/video'):
         print(f"Testing Raspberry Pi camera: {CAMERA_DEVICE}")
-        cap = cv2.VideoCapture(CAMERA_DEVICE)
-        if cap.isOpened():
-            ret, frame = cap.read()
-            if ret and frame is not None:
-                print(f"✓ Raspberry Pi camera {CAMERA_DEVICE} is accessible")
-                cap.release()
-                return CAMERA_DEVICE
-            cap.release()
+        cap = open_camera(CAMERA_DEVICE)
+        if cap is not None:
+            print(f"✓ Raspberry Pi camera {CAMERA_DEVICE} is accessible")
+            return CAMERA_DEVICE, cap
         print(f"✗ Raspberry Pi camera {CAMERA_DEVICE} is not accessible")
     elif CAMERA_DEVICE is None:
         print("No specific camera device set - will auto-detect from available indices")
     
+    # Try the index that worked last time before scanning
+    cached_index = load_cached_camera_index()
+    if cached_index is not None:
+        print(f"Testing last working camera index: {cached_index}")
+        cap = open_camera(cached_index)
+        if cap is not None:
+            print(f"✓ Camera {cached_index} is accessible")
+            return cached_index, cap
+        print(f"✗ Camera {cached_index} is no longer accessible - scanning all indices")
+    
     # Fall back to regular camera indices
     print("Testing regular camera indices...")
-    for camera_index in range(MAX_CAMERA_INDEX):
-        cap = cv2.VideoCapture(camera_index)
-        if cap.isOpened():
-            ret, frame = cap.read()
-            if ret and frame is not None:
-                print(f"✓ Camera {camera_index} is accessible")
-                cap.release()
-                return camera_index
-            cap.release()
-        else:
-            print(f"✗ Camera {camera_index} is not accessible")
+    camera_index, cap = probe_camera_indices(list_camera_indices())
+    if cap is not None:
+        print(f"✓ Camera {camera_index} is accessible")
+        save_cached_camera_index(camera_index)
+        return camera_index, cap
     
     print("❌ No accessible camera found!")
-    return None
+    return None, None
 
 
+@lru_cache(maxsize=1)
 def is_raspberry_pi():
     """
     Check if running on a Raspberry Pi.
+    Cached, since the platform can't change while the process runs.
     """
+    # Only ARM machines can be a Pi - skip reading /proc/cpuinfo everywhere else
+    if not platform.machine().lower().startswith(('arm', 'aarch')):
+        return False
+    
     try:
         with open('/proc/cpuinfo', 'r') as f:
             cpuinfo = f.read()
@@ -70,7 +193,9 @@ def get_optimal_camera_settings():
             'width': CAMERA_WIDTH,
             'height': CAMERA_HEIGHT,
             'fps': min(CAMERA_FPS, 20),  # Limit FPS on Pi for better performance
-            'buffer_size': 1  # Reduce buffer for lower latency
+            'buffer_size': 1,  # Reduce buffer for lower latency
+            # Quantized model runs much faster on ARM, when it has been exported
+            'model_path': INT8_MODEL_PATH if os.path.exists(INT8_MODEL_PATH) else MODEL_PATH
         }
     else:
         print("💻 Detected regular computer - using standard settings")
@@ -78,7 +203,8 @@ def get_optimal_camera_settings():
             'width': CAMERA_WIDTH,
             'height': CAMERA_HEIGHT,
             'fps': CAMERA_FPS,
-            'buffer_size': 3
+            'buffer_size': 3,
+            'model_path': MODEL_PATH
         }
 
 
@@ -96,16 +222,12 @@ def get_camera():
     """
     Initialize and return a camera object with optimal settings.
     """
-    camera_device = test_camera_access()
+    # Reuse the capture opened by the probe instead of opening the device a second time
+    camera_device, cap = test_camera_access()
     if camera_device is None:
         print("❌ No camera available. Exiting...")
         sys.exit(1)
     
-    cap = cv2.VideoCapture(camera_device)
-    if not cap.isOpened():
-        print(f"❌ Failed to open camera {camera_device}")
-        sys.exit(1)
-    
     # Apply optimal camera settings
     settings = get_optimal_camera_settings()
     cap.set(cv2.CAP_PROP_FRAME_WIDTH, settings['width'])
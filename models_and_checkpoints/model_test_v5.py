@@ -7,6 +7,10 @@ import yolov5
 import numpy as np
 import torch
 import os
+import queue
+import signal
+import threading
+import platform
 
 # Fix for PyTorch 2.6+ weights_only issue
 torch.serialization.add_safe_globals(['models.yolo.Model'])
@@ -16,22 +20,56 @@ torch.serialization.add_safe_globals(['models.yolo.Model'])
 # or update the path to point to where your file is.
 MODEL_PATH = 'model3_yolov5.pt' # Or whatever you named your downloaded YOLOv5 model file
 
+# No display to show the video window on (e.g. a headless Raspberry Pi) - skip drawing,
+# cv2.imshow and cv2.waitKey entirely; stop with Ctrl+C instead
+HEADLESS = platform.system() == 'Linux' and not (os.environ.get('DISPLAY') or os.environ.get('WAYLAND_DISPLAY'))
+
+# Box colors, indexed by class id (you can customize this)
+BOX_COLORS = np.array([(0, 255, 0), (255, 0, 0), (0, 0, 255), (255, 255, 0), (255, 0, 255)], dtype=np.int32)
+
+# Every label uses the same font and scale, so measure one once instead of per box
+LABEL_SIZE = cv2.getTextSize("Class 0: 0.00", cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)[0]
+
+def get_camera_backend():
+    """
+    Pick the OpenCV capture backend for this platform explicitly to skip backend autodetection.
+    """
+    system = platform.system()
+    if system == 'Linux':
+        return cv2.CAP_V4L2
+    if system == 'Windows':
+        return cv2.CAP_DSHOW
+    if system == 'Darwin':
+        return cv2.CAP_AVFOUNDATION
+    return cv2.CAP_ANY
+
+def list_camera_indices(max_index=5):
+    """
+    List camera indices to probe - on Linux only the /dev/videoN nodes that actually exist.
+    """
+    sysfs_dir = '/sys/class/video4linux'
+    if platform.system() == 'Linux' and os.path.isdir(sysfs_dir):
+        indices = sorted(int(name[5:]) for name in os.listdir(sysfs_dir)
+                         if name.startswith('video') and name[5:].isdigit())
+        return [index for index in indices if index < max_index]
+    return list(range(max_index))
+
 def test_camera_access():
     """
     Test if webcam is accessible by trying to open it with OpenCV.
+    Returns (camera_index, cap) with the working capture left open, or (None, None).
     """
     print("Testing webcam access...")
     
     # Try different camera indices
-    for camera_index in range(5):  # Try cameras 0-4
+    for camera_index in list_camera_indices(5):  # Try cameras 0-4
         try:
-            cap = cv2.VideoCapture(camera_index)
+            cap = cv2.VideoCapture(camera_index, get_camera_backend())
             if cap.isOpened():
                 ret, frame = cap.read()
                 if ret and frame is not None:
                     print(f"✓ Camera {camera_index} is working!")
-                    cap.release()
-                    return camera_index
+                    return camera_index, cap
                 cap.release()
         except Exception as e:
             continue
@@ -42,57 +80,128 @@ def test_camera_access():
     print("2. Try closing other applications that might be using the camera (Skype, Zoom, etc.)")
     print("3. Check Windows camera permissions in Settings > Privacy > Camera")
     print("4. Restart your computer if the camera was recently connected")
-    return None
+    return None, None
 
-def draw_yolov5_predictions(frame, results, confidence_threshold=0.5):
+def draw_yolov5_predictions(frame, results, out=None, confidence_threshold=0.5):
     """
     Draw YOLOv5 predictions on the frame manually.
+    Draws into `out` if given, otherwise into a buffer reused across calls
+    (so the returned frame is only valid until the next call).
     """
-    annotated_frame = frame.copy()
+    if out is None:
+        buf = getattr(draw_yolov5_predictions, '_buf', None)
+        if buf is None or buf.shape != frame.shape or buf.dtype != frame.dtype:
+            buf = draw_yolov5_predictions._buf = np.empty_like(frame)
+        out = buf
+    if out is not frame:
+        np.copyto(out, frame)
+    annotated_frame = out
     
     # Get predictions from YOLOv5 results
-    predictions = results.pred[0]
-    
     # YOLOv5 results format: [x1, y1, x2, y2, confidence, class]
-    for pred in predictions:
-        if len(pred) >= 6:  # Make sure we have all required values
-            x1, y1, x2, y2, conf, cls = pred[:6]
-            
-            # Apply confidence threshold
-            if conf > confidence_threshold:
-                # Convert to integers
-                x1, y1, x2, y2, cls = int(x1), int(y1), int(x2), int(y2), int(cls)
-                
-                # Choose color based on class (you can customize this)
-                colors = [(0, 255, 0), (255, 0, 0), (0, 0, 255), (255, 255, 0), (255, 0, 255)]
-                color = colors[cls % len(colors)]
-                
-                # Draw bounding box
-                cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, 2)
-                
-                # Draw label with confidence
-                label = f"Class {cls}: {conf:.2f}"
-                label_size = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 2)[0]
-                
-                # Draw label background
-                cv2.rectangle(annotated_frame, (x1, y1 - label_size[1] - 10), 
-                            (x1 + label_size[0], y1), color, -1)
-                
-                # Draw label text
-                cv2.putText(annotated_frame, label, (x1, y1 - 5), 
-                          cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
+    predictions = results.pred[0].cpu().numpy()
+    if predictions.ndim != 2 or predictions.shape[1] < 6:
+        return annotated_frame
+    
+    # Apply confidence threshold and integer conversion to all boxes at once
+    keep = predictions[:, 4] > confidence_threshold
+    boxes = predictions[keep, :4].astype(np.int32)
+    confidences = predictions[keep, 4]
+    classes = predictions[keep, 5].astype(np.int32)
+    colors = BOX_COLORS[classes % len(BOX_COLORS)]
+    label_width, label_height = LABEL_SIZE
+    
+    for (x1, y1, x2, y2), conf, cls, color in zip(boxes.tolist(), confidences.tolist(),
+                                                  classes.tolist(), colors.tolist()):
+        color = tuple(color)
+        
+        # Draw bounding box
+        cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, 2)
+        
+        # Draw label background
+        cv2.rectangle(annotated_frame, (x1, y1 - label_height - 10), 
+                    (x1 + label_width, y1), color, -1)
+        
+        # Draw label text with confidence
+        cv2.putText(annotated_frame, f"Class {cls}: {conf:.2f}", (x1, y1 - 5), 
+                  cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 2)
     
     return annotated_frame
 
+def capture_loop(cap, frame_queue, stop_event, frame_wanted):
+    """
+    Grab frames on a background thread so the camera buffer never goes stale,
+    decoding (retrieve) only the frame handed to inference - skipped frames
+    never pay the decode cost.
+    """
+    while not stop_event.is_set():
+        if not cap.grab():
+            print("✗ Failed to read frame from camera")
+            stop_event.set()
+            break
+        
+        # Inference is still busy with the previous frame - skip this one
+        if not frame_wanted.is_set():
+            continue
+        
+        ret, frame = cap.retrieve()
+        if not ret:
+            print("✗ Failed to read frame from camera")
+            stop_event.set()
+            break
+        frame_wanted.clear()
+        frame_queue.put(frame)
+
+def next_frame(frame_queue, stop_event, frame_wanted):
+    """
+    Ask the capture thread for the next frame and wait for it.
+    Returns None once capture has stopped.
+    """
+    frame_wanted.set()
+    while True:
+        try:
+            return frame_queue.get(timeout=1.0)
+        except queue.Empty:
+            if stop_event.is_set():
+                return None
+
+def export_onnx_model(model_path):
+    """
+    Export the YOLOv5 .pt model to FP32 ONNX once, reusing the export on later runs.
+    FP32 because yolov5.load feeds float32 tensors (an FP16 graph would reject them);
+    ONNX Runtime still runs it on the GPU when the CUDA provider is available.
+    Returns the .onnx path, or None if the export is unavailable.
+    """
+    if not os.path.exists(model_path):
+        return None
+    
+    # Precision is part of the name so an export with a different precision is never reused
+    onnx_path = os.path.splitext(model_path)[0] + '_fp32.onnx'
+    if os.path.exists(onnx_path) and os.path.getmtime(onnx_path) >= os.path.getmtime(model_path):
+        return onnx_path
+    
+    try:
+        from yolov5 import export
+        print(f"📦 Exporting {model_path} to ONNX (one-time)...")
+        export.run(weights=model_path, include=('onnx',), imgsz=(640, 640), half=False, device='cpu')
+        os.replace(os.path.splitext(model_path)[0] + '.onnx', onnx_path)
+    except Exception as e:
+        print(f"⚠️  ONNX export failed, using PyTorch model: {e}")
+        return None
+    return onnx_path
+
 def main():
     """
     Main function to run the model test.
     """
     print(f"Loading YOLOv5 model from: {MODEL_PATH}")
     
+    # Prefer the ONNX export, which runs on ONNX Runtime instead of PyTorch
+    onnx_path = export_onnx_model(MODEL_PATH)
+    
     try:
-        # Load the YOLOv5 model from the .pt file
-        model = yolov5.load(MODEL_PATH)
+        # Load the YOLOv5 model from the ONNX export (or the .pt file)
+        model = yolov5.load(onnx_path or MODEL_PATH)
         print("✓ YOLOv5 model loaded successfully!")
     except Exception as e:
         print(f"✗ Error loading YOLOv5 model: {e}")
@@ -121,35 +230,51 @@ def main():
             return
 
     # Test camera access before running YOLO
-    camera_index = test_camera_access()
+    # Keep the capture opened by the probe instead of reopening the device
+    camera_index, cap = test_camera_access()
     if camera_index is None:
         return
 
     print(f"\nStarting webcam feed using camera {camera_index}...")
-    print("Press 'q' in the video window to quit.")
-    print("A window should appear showing your webcam with gun/threat detection.")
+    if HEADLESS:
+        print("No display detected - running headless. Press Ctrl+C to quit.")
+    else:
+        print("Press 'q' in the video window to quit.")
+        print("A window should appear showing your webcam with gun/threat detection.")
 
     try:
         # Run detection with manual loop for better window control
         print("Starting YOLOv5 detection loop...")
-        cap = cv2.VideoCapture(camera_index)
-        
-        if not cap.isOpened():
-            print("✗ Failed to open camera for detection")
-            return
-        
         print("✓ Camera opened successfully for detection")
         print("Press 'q' in the video window to quit, or Ctrl+C in terminal")
         
+        # Capture on its own thread so camera reads overlap with inference
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        frame_queue = queue.Queue(maxsize=1)
+        stop_event = threading.Event()
+        
+        # Ctrl+C stops capture; the loop then exits through the normal cleanup path
+        def handle_sigint(signum, _frame):
+            print("\nInterrupted by user (Ctrl+C)")
+            stop_event.set()
+        signal.signal(signal.SIGINT, handle_sigint)
+        frame_wanted = threading.Event()
+        capture_thread = threading.Thread(target=capture_loop, args=(cap, frame_queue, stop_event, frame_wanted),
+                                          daemon=True)
+        capture_thread.start()
+        
         while True:
-            ret, frame = cap.read()
-            if not ret:
-                print("✗ Failed to read frame from camera")
+            frame = next_frame(frame_queue, stop_event, frame_wanted)
+            if frame is None:
                 break
             
             # Run YOLOv5 prediction on the frame
             results = model(frame)
             
+            # Nothing to show on a headless device
+            if HEADLESS:
+                continue
+            
             # Draw the results on the frame using custom function
             annotated_frame = draw_yolov5_predictions(frame, results, confidence_threshold=0.5)
             
@@ -168,9 +293,13 @@ def main():
         print("This might be due to camera access issues or the prediction window being closed.")
     finally:
         # Clean up
+        if 'capture_thread' in locals():
+            stop_event.set()
+            capture_thread.join(timeout=2.0)
         if 'cap' in locals():
             cap.release()
-        cv2.destroyAllWindows()
+        if not HEADLESS:
+            cv2.destroyAllWindows()
         print("Detection stopped.")
 
 
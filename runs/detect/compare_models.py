@@ -2,7 +2,379 @@
 # Compare accuracy of newly trained models vs base model
 
 from ultralytics import YOLO
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from operator import itemgetter
+from typing import List, Optional, TypedDict
+import threading
+import numpy as np
+import torch
+import sys
+import io
 import os
+import json
+import hashlib
+import gc
+
+# Validation settings shared by every model - FP16 on CUDA GPUs,
+# with conf/iou unchanged so mAP stays comparable
+USE_CUDA = torch.cuda.is_available()
+VAL_ARGS = {'conf': 0.25, 'iou': 0.7, 'verbose': False, 'half': USE_CUDA, 'device': 0 if USE_CUDA else 'cpu'}
+
+# Decode validation images once and keep them in RAM for every model
+# ('disk' saves decoded .npy files instead; ultralytics falls back itself if RAM is short)
+VAL_ARGS['cache'] = 'ram'
+
+# Optional: xxhash hashes multi-GB weights much faster than sha256
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+# Metrics of already-validated (model, dataset, settings, backend) combinations, so reruns skip them
+METRICS_CACHE_FILE = '.compare_cache.json'
+
+# Cache entry listing the export formats that failed for each model (hash and device), so reruns
+# don't retry a failing TensorRT/OpenVINO export (delete the cache file to retry)
+FAILED_EXPORTS_KEY = 'failed_exports'
+
+# Rough GPU memory per validation image (640x640 input plus activations) used to size the batch
+VAL_IMAGE_BYTES = 3 * 640 * 640 * 4 * 1.2
+
+# Shape of one model's validation results
+Metrics = TypedDict('Metrics', {
+    'model_name': str,
+    'model_path': str,
+    'mAP50': float,
+    'mAP50-95': float,
+    'precision': float,
+    'recall': float
+})
+
+# Metrics reported for each model (dict key, display label), in table column order
+METRIC_KEYS = ('mAP50', 'mAP50-95', 'precision', 'recall')
+METRIC_LABELS = ('mAP50', 'mAP50-95', 'Precision', 'Recall')
+
+# fast_load swaps torch.load process-wide, so concurrent loads must take turns
+_load_lock = threading.Lock()
+
+def fast_load(model_path):
+    """
+    Load a YOLO model with its checkpoint memory-mapped from disk (torch.load mmap=True)
+    instead of reading the whole file into RAM first.
+    """
+    with _load_lock:
+        return _fast_load_locked(model_path)
+
+def _fast_load_locked(model_path):
+    """
+    fast_load body - caller must hold _load_lock.
+    """
+    # Temporarily make ultralytics' internal torch.load memory-map the checkpoint
+    original_load = torch.load
+    torch.load = lambda *args, **kwargs: original_load(*args, **{**kwargs, 'mmap': True})
+    try:
+        return YOLO(model_path)
+    except Exception as e:
+        # Older PyTorch (no mmap) or legacy non-zip checkpoints - load normally
+        print(f"⚠️  Memory-mapped load failed ({e}), loading normally...")
+    finally:
+        torch.load = original_load
+    return YOLO(model_path)
+
+def _read_file(path, chunk_size=1 << 20):
+    """
+    Read a file start to end and discard the data, leaving it in the OS page cache.
+    """
+    try:
+        with open(path, 'rb', buffering=0) as f:
+            while f.read(chunk_size):
+                pass
+    except OSError:
+        pass
+
+def prefetch_model_file(model_path):
+    """
+    Start pulling a model file into the OS page cache in the background, so it is
+    already in RAM when its turn to load comes (the loads themselves run one at a time).
+    """
+    if hasattr(os, 'posix_fadvise'):
+        # Linux/Unix: kernel readahead, no thread needed
+        try:
+            fd = os.open(model_path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+            finally:
+                os.close(fd)
+            return
+        except OSError:
+            pass
+    threading.Thread(target=_read_file, args=(model_path,), daemon=True).start()
+
+def hash_file(path, chunk_size=1 << 20):
+    """
+    Hash a file's contents in chunks (xxh3 when available, sha256 otherwise).
+    """
+    hasher = xxhash.xxh3_64() if xxhash is not None else hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+def metrics_cache_key(model_hash, dataset_yaml, backend):
+    """
+    Cache key for a model's metrics - model contents (hash_file), dataset yaml, validation
+    settings and the backend it was validated with (export format, or 'pt' for the .pt itself).
+    """
+    settings = json.dumps(VAL_ARGS, sort_keys=True).encode()
+    return ":".join([model_hash, hashlib.sha256(dataset_yaml).hexdigest(),
+                     hashlib.sha256(settings).hexdigest(), backend])
+
+def load_metrics_cache():
+    """
+    Load cached metrics, or an empty cache if there is none (or it is unreadable).
+    """
+    try:
+        with open(METRICS_CACHE_FILE, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_metrics_cache(cache):
+    """
+    Write the metrics cache back to disk.
+    """
+    try:
+        with open(METRICS_CACHE_FILE, 'w') as f:
+            json.dump(cache, f, indent=2)
+    except OSError as e:
+        print(f"⚠️  Could not save metrics cache: {e}")
+
+def cached_metrics(cache, cache_key, model_info):
+    """
+    Look up a model's cached metrics, relabelled with its current name and path.
+    Returns None on a cache miss.
+    """
+    if cache_key not in cache:
+        return None
+    print(f"♻️  Using cached metrics for {model_info['name']} (model, dataset and backend unchanged)")
+    return dict(cache[cache_key], model_name=model_info['name'], model_path=model_info['path'])
+
+def export_formats(model_path, dataset_path, batch=None):
+    """
+    Export targets to try, in order - TensorRT on NVIDIA GPUs, INT8 OpenVINO (calibrated
+    on the validation dataset) on CPU-only hosts, with ONNX as the fallback for either.
+    GPU exports take a dynamic batch dimension up to `batch`, so they validate at the
+    autotuned batch size (and still accept the smaller last batch); the batch is part of
+    their file name, so a different autotuned batch builds a matching export.
+    Returns a list of (format, export path, export args).
+    """
+    stem = os.path.splitext(model_path)[0]
+    if USE_CUDA:
+        batch = batch or 1
+        dynamic_args = {'half': True, 'dynamic': True, 'batch': batch}
+        return [
+            ('engine', f"{stem}_b{batch}.engine", dynamic_args),
+            ('onnx', f"{stem}_b{batch}.onnx", dynamic_args)
+        ]
+    return [
+        ('openvino', stem + '_int8_openvino_model', {'int8': True, 'dynamic': False, 'data': dataset_path}),
+        ('onnx', stem + '.onnx', {'dynamic': False})
+    ]
+
+def expected_backend(model_path, dataset_path, failed_formats):
+    """
+    Backend a model will be validated with - the first export format that hasn't failed
+    for it before, or 'pt' when every export has failed.
+    """
+    return next((export_format for export_format, _, _ in export_formats(model_path, dataset_path)
+                 if export_format not in failed_formats), 'pt')
+
+def export_for_validation(model_path, dataset_path, batch=None, failed_formats=None):
+    """
+    Export a model to an inference engine once (see export_formats). Exports are cached
+    next to the .pt and reused until the .pt changes. Formats listed in `failed_formats`
+    are skipped, and formats that fail now are appended to it.
+    Returns (format, exported file path), or ('pt', None) to validate the .pt directly.
+    """
+    failed_formats = [] if failed_formats is None else failed_formats
+    for export_format, export_path, export_args in export_formats(model_path, dataset_path, batch):
+        if export_format in failed_formats:
+            continue
+        if os.path.exists(export_path) and os.path.getmtime(export_path) >= os.path.getmtime(model_path):
+            print(f"📦 Using cached {export_format} export: {export_path}")
+            return export_format, export_path
+        try:
+            print(f"📦 Exporting {model_path} to {export_format}...")
+            exported_path = fast_load(model_path).export(format=export_format, imgsz=640,
+                                                         device=VAL_ARGS['device'], **export_args)
+            # ultralytics names exports after the .pt; rename to the cached name checked above
+            if os.path.abspath(exported_path) != os.path.abspath(export_path):
+                os.replace(exported_path, export_path)
+            return export_format, export_path
+        except Exception as e:
+            print(f"⚠️  {export_format} export failed: {e}")
+            failed_formats.append(export_format)
+    return 'pt', None
+
+def release_gpu_memory():
+    """
+    Free memory held by models that are no longer referenced and return cached
+    CUDA blocks to the driver.
+    """
+    gc.collect()
+    if USE_CUDA:
+        torch.cuda.empty_cache()
+
+def autotune_val_batch(concurrent_models):
+    """
+    Pick the largest validation batch that fits in free GPU memory, shared between the
+    models validated at the same time (a power of two in 8-128, so small changes in free
+    memory don't change the batch - GPU exports are rebuilt when it does).
+    Returns None on CPU to keep ultralytics' default.
+    """
+    if not USE_CUDA:
+        return None
+    
+    free_bytes, _ = torch.cuda.mem_get_info()
+    image_bytes = VAL_IMAGE_BYTES / 2 if VAL_ARGS['half'] else VAL_IMAGE_BYTES
+    batch = int(free_bytes * 0.8 / concurrent_models / image_bytes)
+    return 1 << (max(8, min(128, batch)).bit_length() - 1)
+
+def build_val_dataset(dataset_path, batch=None, rect=True):
+    """
+    Build the validation dataset once (label scan, image size reads, caching) so every
+    model reuses it instead of each model.val() rebuilding it from scratch.
+    PyTorch models use rectangular batches; exported engines have a fixed square input,
+    so they need rect=False.
+    Returns (cfg, dataset), or (None, None) if it can't be prebuilt.
+    """
+    try:
+        from ultralytics.cfg import get_cfg
+        from ultralytics.data.build import build_yolo_dataset
+        from ultralytics.data.utils import check_det_dataset
+        from ultralytics.utils import DEFAULT_CFG
+        
+        overrides = {'data': dataset_path, 'mode': 'val', 'rect': rect, **VAL_ARGS}
+        if batch:
+            overrides['batch'] = batch
+        cfg = get_cfg(DEFAULT_CFG, overrides)
+        data = check_det_dataset(dataset_path)
+        dataset = build_yolo_dataset(cfg, data['val'], cfg.batch, data, mode='val', rect=rect, stride=32)
+        print(f"📦 Validation dataset prepared once: {len(dataset)} images ({'rect' if rect else 'square'})")
+        return cfg, dataset
+    except Exception as e:
+        print(f"⚠️  Could not prebuild validation dataset ({e}) - each model will build its own")
+        return None, None
+
+def run_validation(model, dataset_path, val_cfg=None, val_dataset=None, batch=None, name=None):
+    """
+    Validate a loaded model, reusing the prebuilt dataset when there is one.
+    `name` gives the model its own run directory (runs/detect/<name>, reused across reruns)
+    so concurrent validations don't race for the same auto-incremented valN folder.
+    Returns the validation metrics (same object model.val() returns).
+    """
+    val_args = dict(VAL_ARGS, name=name, exist_ok=True) if name else dict(VAL_ARGS)
+    
+    if val_dataset is None:
+        if batch:
+            val_args['batch'] = batch
+        return model.val(data=dataset_path, **val_args)
+    
+    from ultralytics.data.build import build_dataloader
+    from ultralytics.models.yolo.detect import DetectionValidator
+    
+    # Each thread needs its own loader (ultralytics loaders keep a single shared iterator),
+    # but creating one over the existing dataset is cheap
+    dataloader = build_dataloader(val_dataset, val_cfg.batch, val_cfg.workers, shuffle=False, rank=-1)
+    validator = DetectionValidator(dataloader=dataloader, args={'data': dataset_path, 'rect': val_cfg.rect,
+                                                                'batch': val_cfg.batch, **val_args})
+    # model.model is the nn.Module for .pt models and the export path for exported engines,
+    # which the validator loads through AutoBackend
+    validator(model=model.model)
+    return validator.metrics
+
+@torch.inference_mode()
+def _validate(model_info, dataset_path, val_cfg=None, val_dataset=None, val_batch=None, compile_model=False):
+    """
+    Validate one model on the dataset.
+    Loading and validation both run under inference mode (no autograd tracking).
+    compile_model allows torch.compile on CUDA - only safe when no other model is being
+    validated at the same time, since Dynamo compilation isn't thread-safe.
+    Returns its metrics dict, or None if validation failed.
+    """
+    model_name = model_info['name']
+    model_path = model_info['path']
+    
+    print(f"\n🧪 Testing: {model_name}")
+    print(f"📁 Model: {model_path}")
+    
+    model = val_results = None
+    try:
+        # Load model (memory-mapped)
+        export_path = model_info.get('export_path')
+        if export_path:
+            # Validate the exported engine (TensorRT/OpenVINO/ONNX Runtime)
+            model = YOLO(export_path, task='detect')
+        else:
+            model = fast_load(model_path)
+            
+            # On CPU use NHWC weights so convolutions hit oneDNN's channels-last kernels
+            if not USE_CUDA:
+                model.model = model.model.to(memory_format=torch.channels_last)
+            elif compile_model and hasattr(torch, 'compile'):
+                # Compile the forward into fused kernels. Only the bound method is replaced so
+                # ultralytics' fuse()/attribute access still see the original DetectionModel;
+                # tracing happens on the first validation batch, after fusing.
+                model.model.forward = torch.compile(model.model.forward, dynamic=None)
+        
+        # Own CUDA stream so this model's kernels don't serialize behind the other thread's
+        stream = torch.cuda.Stream() if USE_CUDA else None
+        
+        # Run validation
+        print(f"📊 Running validation ({model_name})...")
+        with torch.cuda.stream(stream) if stream is not None else nullcontext():
+            val_results = run_validation(model, dataset_path, val_cfg, val_dataset, val_batch,
+                                         name=f"val_{os.path.splitext(os.path.basename(model_path))[0]}")
+        
+        # Extract metrics
+        metrics: Metrics = {
+            'model_name': model_name,
+            'model_path': model_path,
+            'mAP50': float(val_results.box.map50),
+            'mAP50-95': float(val_results.box.map),
+            'precision': float(val_results.box.mp),
+            'recall': float(val_results.box.mr)
+        }
+        
+        print(f"✅ Results ({model_name}):")
+        print(f"  mAP50: {metrics['mAP50']:.3f}")
+        print(f"  mAP50-95: {metrics['mAP50-95']:.3f}")
+        print(f"  Precision: {metrics['precision']:.3f}")
+        print(f"  Recall: {metrics['recall']:.3f}")
+        
+        return metrics
+        
+    except Exception as e:
+        print(f"❌ Error testing {model_name}: {e}")
+        return None
+    
+    finally:
+        # Release this model's GPU memory as soon as it's done, not when the comparison ends
+        del model, val_results
+        release_gpu_memory()
+
+def assess_improvement(overall_improvement):
+    """
+    Describe an overall mAP improvement over the base model.
+    """
+    if overall_improvement > 0.05:
+        return "🏆 SIGNIFICANT IMPROVEMENT! Your training was very successful!"
+    elif overall_improvement > 0.02:
+        return "✅ GOOD IMPROVEMENT! Your training was successful."
+    elif overall_improvement > 0:
+        return "👍 SLIGHT IMPROVEMENT! Training helped a bit."
+    return "⚠️  NO IMPROVEMENT. You may need more training data or different parameters."
 
 def compare_model_accuracy():
     """
@@ -25,10 +397,14 @@ def compare_model_accuracy():
     
     # Create corrected dataset path for local testing
     dataset_base = 'guns-knives-yolo/guns-knives-yolo'
+    dataset_dir = os.path.abspath(dataset_base)
+    if not os.path.isdir(dataset_dir):
+        print(f"❌ Dataset not found: {dataset_dir}")
+        return []
     
     # Create corrected yaml content for local paths
     yaml_content = f"""
-path: {os.path.abspath(dataset_base)}
+path: {dataset_dir}
 train: train/images
 val: valid/images
 
@@ -36,103 +412,151 @@ nc: 2
 names: ["knife", "pistol"]
 """
     
-    # Save corrected yaml
+    # Save corrected yaml - only when it changed, so its mtime (and caches keyed on it) survive reruns
     corrected_yaml_path = 'corrected_dataset.yaml'
-    with open(corrected_yaml_path, 'w') as f:
-        f.write(yaml_content.strip())
+    new_yaml = yaml_content.strip().encode()
+    existing_yaml = None
+    if os.path.exists(corrected_yaml_path):
+        with open(corrected_yaml_path, 'rb') as f:
+            existing_yaml = f.read()
+    if existing_yaml != new_yaml:
+        with open(corrected_yaml_path, 'wb') as f:
+            f.write(new_yaml)
     
     dataset_path = corrected_yaml_path
     print(f"📁 Using corrected dataset paths: {dataset_path}")
     
-    results = []
+    # Skip missing models, and models whose metrics are cached, before exporting or validating anything
+    metrics_cache = load_metrics_cache()
+    failed_exports = metrics_cache.setdefault(FAILED_EXPORTS_KEY, {})
+    # One slot per model, filled by index, so results keep input order whichever thread finishes first
+    model_results: List[Optional[Metrics]] = [None] * len(models_to_compare)
     
-    for model_info in models_to_compare:
-        model_name = model_info['name']
-        model_path = model_info['path']
+    pending_models = []
+    for index, model_info in enumerate(models_to_compare):
+        if not os.path.exists(model_info['path']):
+            print(f"❌ Model not found: {model_info['path']}")
+            continue
         
-        print(f"\n🧪 Testing: {model_name}")
-        print(f"📁 Model: {model_path}")
+        # The key records the backend the model will be validated with, known before exporting
+        # from the formats that already failed for this model
+        model_hash = hash_file(model_info['path'])
+        model_info = dict(model_info, index=index, model_hash=model_hash,
+                          export_key=f"{model_hash}:{VAL_ARGS['device']}")
+        failed_formats = failed_exports.get(model_info['export_key'], [])
+        backend = expected_backend(model_info['path'], dataset_path, failed_formats)
+        cache_key = metrics_cache_key(model_info['model_hash'], new_yaml, backend)
+        cached = cached_metrics(metrics_cache, cache_key, model_info)
+        if cached is not None:
+            model_results[index] = cached
+            continue
+        
+        prefetch_model_file(model_info['path'])
+        pending_models.append(model_info)
+    
+    # Size the validation batch before exporting - GPU exports are built to take it.
+    # Nothing is loaded on the GPU yet; release anything left over so the measurement is accurate.
+    release_gpu_memory()
+    val_batch = autotune_val_batch(len(pending_models)) if pending_models else None
+    if val_batch:
+        print(f"📏 Validation batch size: {val_batch}")
+    
+    # Export each model to an inference engine once, one at a time (engine builds are GPU-heavy)
+    exported_models = []
+    for model_info in pending_models:
+        failed_formats = failed_exports.setdefault(model_info['export_key'], [])
+        backend, export_path = export_for_validation(model_info['path'], dataset_path, val_batch, failed_formats)
+        if not failed_formats:
+            del failed_exports[model_info['export_key']]
         
-        if not os.path.exists(model_path):
-            print(f"❌ Model not found: {model_path}")
+        # A newly failed export falls back to another backend, which may have cached metrics
+        cache_key = metrics_cache_key(model_info['model_hash'], new_yaml, backend)
+        cached = cached_metrics(metrics_cache, cache_key, model_info)
+        if cached is not None:
+            model_results[model_info['index']] = cached
             continue
         
-        try:
-            # Load model
-            model = YOLO(model_path)
-            
-            # Run validation
-            print("📊 Running validation...")
-            val_results = model.val(
-                data=dataset_path,
-                conf=0.25,
-                iou=0.7,
-                verbose=False  # Less verbose output
-            )
-            
-            # Extract metrics
-            metrics = {
-                'model_name': model_name,
-                'model_path': model_path,
-                'mAP50': float(val_results.box.map50),
-                'mAP50-95': float(val_results.box.map),
-                'precision': float(val_results.box.mp),
-                'recall': float(val_results.box.mr)
-            }
-            
-            results.append(metrics)
-            
-            print(f"✅ Results:")
-            print(f"  mAP50: {metrics['mAP50']:.3f}")
-            print(f"  mAP50-95: {metrics['mAP50-95']:.3f}")
-            print(f"  Precision: {metrics['precision']:.3f}")
-            print(f"  Recall: {metrics['recall']:.3f}")
-            
-        except Exception as e:
-            print(f"❌ Error testing {model_name}: {e}")
+        if export_path:
+            prefetch_model_file(export_path)
+        exported_models.append(dict(model_info, export_path=export_path, cache_key=cache_key))
+    pending_models = exported_models
     
-    # Print comparison summary
+    # Drop the models loaded for export before validation starts
+    release_gpu_memory()
+    
+    # Validate all models concurrently - one thread (and CUDA stream) per model
+    if pending_models:
+        # Build each shared dataset once, for the kind of model that needs it - rectangular
+        # batches for PyTorch models, square ones for exported engines (dynamic up to the
+        # autotuned batch on GPU, static batch 1 on CPU)
+        pt_dataset = export_dataset = (None, None)
+        if any(not model_info['export_path'] for model_info in pending_models):
+            pt_dataset = build_val_dataset(dataset_path, val_batch)
+        if any(model_info['export_path'] for model_info in pending_models):
+            export_dataset = build_val_dataset(dataset_path, val_batch if USE_CUDA else 1, rect=False)
+        
+        # torch.compile traces lazily on the first batch, i.e. inside the worker threads -
+        # only allow it when a single model is validated, so two compilations never overlap
+        compile_model = len(pending_models) == 1
+        with ThreadPoolExecutor(max_workers=len(pending_models)) as executor:
+            futures = [executor.submit(_validate, model_info, dataset_path,
+                                       *(export_dataset if model_info['export_path'] else pt_dataset), val_batch,
+                                       compile_model=compile_model)
+                       for model_info in pending_models]
+            for model_info, future in zip(pending_models, futures):
+                metrics = future.result()
+                if metrics is not None:
+                    model_results[model_info['index']] = metrics
+                    metrics_cache[model_info['cache_key']] = metrics
+    save_metrics_cache(metrics_cache)
+    
+    # Keep input order so the base model stays first
+    results = [metrics for metrics in model_results if metrics is not None]
+    
+    # Print comparison summary - built in one buffer and written to stdout at once
     if len(results) >= 2:
-        print(f"\n📊 ACCURACY COMPARISON SUMMARY")
-        print("=" * 60)
-        print(f"{'Model':<20} {'mAP50':<8} {'mAP50-95':<8} {'Precision':<10} {'Recall':<8}")
-        print("-" * 60)
-        
-        for result in results:
-            print(f"{result['model_name']:<20} {result['mAP50']:<8.3f} {result['mAP50-95']:<8.3f} {result['precision']:<10.3f} {result['recall']:<8.3f}")
-        
-        # Calculate improvements
-        base_model = results[0]  # Assuming first is base model
-        improved_model = results[1]  # Assuming second is improved model
-        
-        print(f"\n📈 IMPROVEMENT ANALYSIS")
-        print("-" * 40)
-        
-        mAP50_improvement = improved_model['mAP50'] - base_model['mAP50']
-        mAP50_95_improvement = improved_model['mAP50-95'] - base_model['mAP50-95']
-        precision_improvement = improved_model['precision'] - base_model['precision']
-        recall_improvement = improved_model['recall'] - base_model['recall']
-        
-        print(f"mAP50 improvement: {mAP50_improvement:+.3f} ({mAP50_improvement/base_model['mAP50']*100:+.1f}%)")
-        print(f"mAP50-95 improvement: {mAP50_95_improvement:+.3f} ({mAP50_95_improvement/base_model['mAP50-95']*100:+.1f}%)")
-        print(f"Precision improvement: {precision_improvement:+.3f} ({precision_improvement/base_model['precision']*100:+.1f}%)")
-        print(f"Recall improvement: {recall_improvement:+.3f} ({recall_improvement/base_model['recall']*100:+.1f}%)")
-        
-        # Overall assessment
-        overall_improvement = (mAP50_improvement + mAP50_95_improvement) / 2
-        
-        print(f"\n🎯 OVERALL ASSESSMENT")
-        print("-" * 25)
-        if overall_improvement > 0.05:
-            print("🏆 SIGNIFICANT IMPROVEMENT! Your training was very successful!")
-        elif overall_improvement > 0.02:
-            print("✅ GOOD IMPROVEMENT! Your training was successful.")
-        elif overall_improvement > 0:
-            print("👍 SLIGHT IMPROVEMENT! Training helped a bit.")
-        else:
-            print("⚠️  NO IMPROVEMENT. You may need more training data or different parameters.")
+        buf = io.StringIO()
+        buf.write(f"\n📊 ACCURACY COMPARISON SUMMARY\n")
+        buf.write("=" * 60 + "\n")
+        buf.write(f"{'Model':<20} {'mAP50':<8} {'mAP50-95':<8} {'Precision':<10} {'Recall':<8}\n")
+        buf.write("-" * 60 + "\n")
+        
+        # One row per model, one column per metric
+        metrics = np.array([[result[key] for key in METRIC_KEYS] for result in results], dtype=np.float64)
+        
+        buf.writelines(f"{result['model_name']:<20} {row[0]:<8.3f} {row[1]:<8.3f} {row[2]:<10.3f} {row[3]:<8.3f}\n"
+                       for result, row in zip(results, metrics.tolist()))
+        
+        # Calculate improvements of every model over the base model (first row) at once
+        delta = metrics[1:] - metrics[0]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct = delta / metrics[0] * 100
+        
+        buf.write(f"\n📈 IMPROVEMENT ANALYSIS (vs {results[0]['model_name']})\n")
+        buf.write("-" * 40 + "\n")
+        
+        for result, model_delta, model_pct in zip(results[1:], delta.tolist(), pct.tolist()):
+            buf.write(f"\n{result['model_name']}:\n")
+            buf.writelines(f"{label} improvement: {d:+.3f} ({p:+.1f}%)\n"
+                           for label, d, p in zip(METRIC_LABELS, model_delta, model_pct))
+        
+        # Overall assessment (mean of the mAP50 and mAP50-95 improvements) for each model
+        overall_improvements = delta[:, :2].mean(axis=1).tolist()
+        
+        buf.write(f"\n🎯 OVERALL ASSESSMENT\n")
+        buf.write("-" * 25 + "\n")
+        for result, overall_improvement in zip(results[1:], overall_improvements):
+            buf.write(f"{result['model_name']}: {assess_improvement(overall_improvement)}\n")
+            buf.write(f"Overall mAP improvement: {overall_improvement:+.3f}\n")
+        
+        # Leaderboard across all models
+        buf.write(f"\n🏅 RANKING (by mAP50-95)\n")
+        buf.write("-" * 40 + "\n")
+        buf.writelines(f"{rank}. {result['model_name']:<20} {result['mAP50-95']:.3f}\n"
+                       for rank, result in enumerate(sorted(results, key=itemgetter('mAP50-95'), reverse=True), 1))
         
-        print(f"Overall mAP improvement: {overall_improvement:+.3f}")
+        sys.stdout.write(buf.getvalue())
+        sys.stdout.flush()
     
     return results
 